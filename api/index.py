@@ -1,14 +1,31 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from mangum import Mangum
-import sys
-import os
+import asyncio
+import logging
 
-# Add the backend app to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from mangum import Mangum
 
+# The project root is the working directory on Vercel, so `backend` resolves
+# without touching sys.path.
+from backend.app.database import init_db
 from backend.app.main import app as fastapi_app
 
-# CORS is already configured in main.py 
+# CORS is already configured in main.py
 # Export the handler for Vercel Serverless
 handler = Mangum(fastapi_app, lifespan="off")
+
+# Use uvloop (shipped with uvicorn[standard]) for the loop Mangum drives, where available.
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - e.g. Windows
+    pass
+else:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+# Lifespan is off, so warm the DB pool here while the container boots. Mangum
+# drives requests on this same event loop, so the pool stays usable.
+try:
+    asyncio.get_event_loop().run_until_complete(init_db())
+except Exception:
+    # Missing DATABASE_URL or unreachable DB: get_pool() retries lazily per request.
+    logging.getLogger(__name__).warning(
+        "Database prewarm failed; falling back to lazy pool creation", exc_info=True
+    )
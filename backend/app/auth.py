@@ -2,32 +2,54 @@
 Authentication utilities for JWT token generation and password hashing.
 """
 
+import asyncio
+import base64
+import hashlib
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
+import orjson
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from .config import Settings, get_settings
-from .database import get_user_by_id, get_user_by_username
+from .database import get_user_by_id, get_user_by_username, update_user_password_hash
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context: new hashes use argon2, existing bcrypt hashes still verify.
+pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+
+# Verified against when the username is unknown so both login paths cost the same.
+_DUMMY_HASH = pwd_context.hash("dummy-password")
 
 # HTTP Bearer token scheme
 security = HTTPBearer(auto_error=False)
 
+# Verified token payloads keyed by SHA-256 of the raw token, so reused bearer
+# tokens skip signature verification. Entries never outlive the token's exp.
+_JWT_CACHE_TTL = 30  # seconds
+_JWT_CACHE_MAX_SIZE = 10000
+_jwt_cache: Dict[bytes, Tuple[float, dict]] = {}
+
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a plain password against its hash (runs in a worker thread)."""
+    return await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> str:
-    """Generate a hash from a plain password."""
-    return pwd_context.hash(password)
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and, if its hash uses a deprecated scheme (bcrypt), return a
+    fresh argon2 hash to store in its place (runs in a worker thread).
+    """
+    return await asyncio.to_thread(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash(password: str) -> str:
+    """Generate a hash from a plain password (runs in a worker thread)."""
+    return await asyncio.to_thread(pwd_context.hash, password)
 
 
 def create_access_token(data: dict, settings: Settings, expires_delta: Optional[timedelta] = None) -> str:
@@ -46,17 +68,59 @@ def create_access_token(data: dict, settings: Settings, expires_delta: Optional[
     return encoded_jwt
 
 
+def _peek_exp(token: str) -> Optional[float]:
+    """
+    Read the exp claim without verifying the signature.
+    Only used to reject expired tokens early; never trusted on its own.
+    """
+    segments = token.split(".")
+    if len(segments) != 3:
+        return None
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(segments[1] + "=" * (-len(segments[1]) % 4)))
+        exp = payload.get("exp")
+        return float(exp) if exp is not None else None
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
 def decode_access_token(token: str, settings: Settings) -> Optional[dict]:
     """
     Decode and verify a JWT access token.
     Returns the payload if valid, None if invalid.
+    Successful validations are cached briefly; failures are never cached.
     """
+    key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+
+    cached = _jwt_cache.get(key)
+    if cached:
+        expires_at, payload = cached
+        if expires_at > now:
+            return payload
+        del _jwt_cache[key]
+
+    # Expired tokens fail verification anyway; skip the HMAC for them.
+    exp = _peek_exp(token)
+    if exp is not None and exp <= now:
+        return None
+
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm])
-        return payload
     except JWTError:
         return None
 
+    expires_at = now + _JWT_CACHE_TTL
+    exp = payload.get("exp")
+    if exp is not None:
+        expires_at = min(expires_at, float(exp))
+
+    # Evict the oldest entry once full (dicts keep insertion order).
+    if len(_jwt_cache) >= _JWT_CACHE_MAX_SIZE:
+        _jwt_cache.pop(next(iter(_jwt_cache)))
+    _jwt_cache[key] = (expires_at, payload)
+    return payload
+
 
 async def authenticate_user(username: str, password: str) -> Optional[dict]:
     """
@@ -65,14 +129,43 @@ async def authenticate_user(username: str, password: str) -> Optional[dict]:
     """
     user = await get_user_by_username(username)
     if not user:
+        await verify_password(password, _DUMMY_HASH)
         return None
-    if not verify_password(password, user["hashed_password"]):
+    valid, new_hash = await verify_and_update_password(password, user["hashed_password"])
+    if not valid:
         return None
+    if new_hash:
+        # Upgrade legacy bcrypt hashes on login so every account converges on argon2,
+        # the same scheme as _DUMMY_HASH, and unknown usernames stop timing differently.
+        await update_user_password_hash(user["id"], new_hash)
+        user["hashed_password"] = new_hash
     if not user.get("is_active", True):
         return None
     return user
 
 
+# Shared WWW-Authenticate header for 401 responses.
+_BEARER_CHALLENGE = {"WWW-Authenticate": "Bearer"}
+
+
+async def _resolve_user(token: str, settings: Settings) -> Optional[dict]:
+    """
+    Resolve a bearer token to its user record.
+    Returns None if the token is invalid or the user no longer exists.
+    """
+    payload = decode_access_token(token, settings)
+    if not payload:
+        return None
+    
+    # sub is a string per RFC 7519 (and python-jose enforces it); it holds the user id.
+    try:
+        user_id = int(payload["sub"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    
+    return await get_user_by_id(user_id)
+
+
 async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     settings: Settings = Depends(get_settings)
@@ -84,28 +177,15 @@ async def get_current_user(
     if not credentials:
         return None
     
-    token = credentials.credentials
-    payload = decode_access_token(token, settings)
-    
-    if not payload:
-        return None
-    
-    user_id: int = payload.get("sub")
-    if user_id is None:
-        return None
-    
-    user = await get_user_by_id(user_id)
-    if not user:
-        return None
-    
-    if not user.get("is_active", True):
+    user = await _resolve_user(credentials.credentials, settings)
+    if not user or not user.get("is_active", True):
         return None
     
     return user
 
 
 async def get_current_user_required(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     settings: Settings = Depends(get_settings)
 ) -> dict:
     """
@@ -116,33 +196,15 @@ async def get_current_user_required(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"},
+            headers=_BEARER_CHALLENGE,
         )
     
-    token = credentials.credentials
-    payload = decode_access_token(token, settings)
-    
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user_id: int = payload.get("sub")
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user = await get_user_by_id(user_id)
+    user = await _resolve_user(credentials.credentials, settings)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
+            detail="Invalid authentication credentials",
+            headers=_BEARER_CHALLENGE,
         )
     
     if not user.get("is_active", True):
@@ -1,130 +1,284 @@
 """
 PostgreSQL database setup and persistence layer for workflows.
 Handles workflow CRUD (create, read, update, delete) operations.
+
+List queries return asyncpg Records as-is rather than copying each row into a
+dict here; they are read-only Mappings, and the response layer converts each row
+to a dict once while serializing (see RecordJSONResponse in main.py).
 """
 
-import json
+import asyncio
+import logging
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
 
 import asyncpg
+import orjson
 
 from .config import Settings, get_settings
 
+logger = logging.getLogger(__name__)
 
 # Module-level connection pool for efficient DB access across requests.
 _pool: asyncpg.Pool | None = None
+# Guards pool creation so concurrent first requests don't each build a pool.
+_pool_lock = asyncio.Lock()
 
+# Upper bound on the client-supplied limit for the chat/execution log listings, so one
+# request can't pull a whole log table. Workflow and document lists are not capped:
+# they have no paging, so a cap would silently hide a user's rows.
+MAX_LIST_ROWS = 500
 
-async def init_db() -> asyncpg.Pool:
-    """Initialize the PostgreSQL connection pool and create schema if needed."""
-    global _pool
-    settings = get_settings()
-    if not settings.database_url:
-        raise ValueError("DATABASE_URL not set in environment")
+# Short-lived cache of user rows by id; auth dependencies hit this on every request.
+_USER_CACHE_TTL = 60  # seconds
+_USER_CACHE_MAX_SIZE = 5000
+_user_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
 
-    _pool = await asyncpg.create_pool(settings.database_url, min_size=2, max_size=10)
 
-    async with _pool.acquire() as conn:
-        # Create users table for authentication.
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                uuid VARCHAR(36) UNIQUE NOT NULL DEFAULT gen_random_uuid()::text,
-                username VARCHAR(255) UNIQUE NOT NULL,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                hashed_password VARCHAR(255) NOT NULL,
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT NOW(),
-                updated_at TIMESTAMP DEFAULT NOW()
-            )
-            """
-        )
-        
-        # Create workflows table to store workflow definitions and metadata.
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS workflows (
-                id SERIAL PRIMARY KEY,
-                uuid VARCHAR(36) UNIQUE NOT NULL DEFAULT gen_random_uuid()::text,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                name VARCHAR(255) NOT NULL,
-                description TEXT,
-                nodes JSONB NOT NULL,
-                edges JSONB NOT NULL,
-                created_at TIMESTAMP DEFAULT NOW(),
-                updated_at TIMESTAMP DEFAULT NOW()
-            )
-            """
-        )
-        
-        # Create documents table to store metadata for uploaded documents.
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS documents (
-                id SERIAL PRIMARY KEY,
-                uuid VARCHAR(36) UNIQUE NOT NULL DEFAULT gen_random_uuid()::text,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                filename VARCHAR(512) NOT NULL,
-                file_size INTEGER,
-                collection_name VARCHAR(255) NOT NULL,
-                chunk_count INTEGER DEFAULT 0,
-                embedding_model VARCHAR(255),
-                created_at TIMESTAMP DEFAULT NOW()
-            )
-            """
-        )
-        
-        # Create chat_logs table to store conversation history.
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS chat_logs (
-                id SERIAL PRIMARY KEY,
-                uuid VARCHAR(36) UNIQUE NOT NULL DEFAULT gen_random_uuid()::text,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                workflow_uuid VARCHAR(36),
-                message TEXT NOT NULL,
-                response TEXT NOT NULL,
-                provider VARCHAR(50),
-                context_used INTEGER DEFAULT 0,
-                web_used BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT NOW(),
-                FOREIGN KEY (workflow_uuid) REFERENCES workflows(uuid) ON DELETE SET NULL
-            )
-            """
-        )
-        
-        # Create execution_logs table to track workflow execution details.
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS execution_logs (
-                id SERIAL PRIMARY KEY,
-                uuid VARCHAR(36) UNIQUE NOT NULL DEFAULT gen_random_uuid()::text,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                workflow_uuid VARCHAR(36),
-                workflow_name VARCHAR(255),
-                status VARCHAR(50) NOT NULL,
-                message TEXT,
-                response TEXT,
-                provider VARCHAR(50),
-                execution_time_ms INTEGER,
-                error_message TEXT,
-                context_used INTEGER DEFAULT 0,
-                web_used BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT NOW(),
-                FOREIGN KEY (workflow_uuid) REFERENCES workflows(uuid) ON DELETE SET NULL
-            )
-            """
+# Hot-path SELECTs, kept as constants so each pooled connection can prepare them up front.
+SQL_GET_WORKFLOW = "SELECT id, uuid, name, description, nodes, edges, created_at, updated_at FROM workflows WHERE uuid = $1"
+SQL_GET_USER_BY_USERNAME = "SELECT id, uuid, username, email, hashed_password, is_active, created_at FROM users WHERE username = $1"
+SQL_GET_USER_BY_ID = "SELECT id, uuid, username, email, is_active, created_at FROM users WHERE id = $1"
+SQL_GET_USER_BY_EMAIL = "SELECT id, uuid, username, email, hashed_password, is_active, created_at FROM users WHERE email = $1"
+
+# Statements warmed on every new pool connection, with a key that never matches.
+_WARM_STATEMENTS = (
+    (SQL_GET_WORKFLOW, UUID(int=0)),
+    (SQL_GET_USER_BY_USERNAME, ""),
+    (SQL_GET_USER_BY_EMAIL, ""),
+    (SQL_GET_USER_BY_ID, 0),
+)
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    # Binary JSONB wire format is a version byte followed by the JSON text.
+    return b"\x01" + orjson.dumps(value)
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    # Skip the version byte through a memoryview so large payloads aren't copied first.
+    return orjson.loads(memoryview(data)[1:])
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """
+    Per-connection setup: send and receive JSONB as Python objects via orjson,
+    and prepare the hot SELECTs so the first real request skips parse/plan.
+    """
+    await conn.set_type_codec(
+        "jsonb",
+        encoder=_encode_jsonb,
+        decoder=_decode_jsonb,
+        schema="pg_catalog",
+        format="binary",
+    )
+    # Running each statement once with a non-matching key places it in the
+    # connection's statement cache, which fetchrow() consults on every call.
+    # init_db migrates the schema before the pool exists, so these tables and
+    # column types are always current here.
+    for sql, key in _WARM_STATEMENTS:
+        await conn.fetchrow(sql, key)
+
+
+def invalidate_user_cache(user_id: int) -> None:
+    """Drop a cached user row so the next lookup hits the database."""
+    _user_cache.pop(user_id, None)
+
+
+async def init_db() -> asyncpg.Pool:
+    """
+    Initialize the PostgreSQL connection pool and create schema if needed.
+    Called once at application startup; later calls reuse the existing pool.
+    """
+    global _pool
+    async with _pool_lock:
+        if _pool is not None:
+            return _pool
+
+        settings = get_settings()
+        if not settings.database_url:
+            raise ValueError("DATABASE_URL not set in environment")
+
+        # Create/migrate the schema on a plain connection first: the pool's init warms
+        # statements typed against the final schema (e.g. uuid columns as UUID), which
+        # would fail on a database still waiting for the VARCHAR -> UUID migration.
+        conn = await asyncpg.connect(settings.database_url, command_timeout=settings.db_command_timeout)
+        try:
+            await create_schema(conn)
+        finally:
+            await conn.close()
+
+        pool = await asyncpg.create_pool(
+            settings.database_url,
+            min_size=settings.db_pool_min_size,
+            max_size=settings.db_pool_max_size,
+            statement_cache_size=settings.db_statement_cache_size,
+            max_inactive_connection_lifetime=settings.db_max_inactive_connection_lifetime,
+            command_timeout=settings.db_command_timeout,
+            # Short OLTP queries never benefit from JIT compilation.
+            server_settings={"jit": "off"},
+            init=_init_connection,
         )
+        _pool = pool
     return _pool
 
 
-async def get_pool() -> asyncpg.Pool:
-    """Get or initialize the database connection pool."""
+async def close_db() -> None:
+    """Close the connection pool on application shutdown."""
     global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+# Bump whenever the DDL in create_schema changes so existing databases re-run it.
+SCHEMA_VERSION = "workflow-builder schema v2"
+
+
+async def create_schema(conn: asyncpg.Connection) -> None:
+    """
+    Create all tables and indexes if they don't exist yet, in a single round-trip.
+    Skipped entirely when the database is already at SCHEMA_VERSION.
+    """
+    current = await conn.fetchval("SELECT obj_description(to_regclass('public.users'), 'pg_class')")
+    if current == SCHEMA_VERSION:
+        return
+
+    await conn.execute(
+        """
+        -- Users table for authentication.
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            uuid UUID UNIQUE NOT NULL DEFAULT gen_random_uuid(),
+            username VARCHAR(255) UNIQUE NOT NULL,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            hashed_password VARCHAR(255) NOT NULL,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT NOW(),
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+
+        -- Workflows table to store workflow definitions and metadata.
+        CREATE TABLE IF NOT EXISTS workflows (
+            id SERIAL PRIMARY KEY,
+            uuid UUID UNIQUE NOT NULL DEFAULT gen_random_uuid(),
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            name VARCHAR(255) NOT NULL,
+            description TEXT,
+            nodes JSONB NOT NULL,
+            edges JSONB NOT NULL,
+            created_at TIMESTAMP DEFAULT NOW(),
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+
+        -- Documents table to store metadata for uploaded documents.
+        CREATE TABLE IF NOT EXISTS documents (
+            id SERIAL PRIMARY KEY,
+            uuid UUID UNIQUE NOT NULL DEFAULT gen_random_uuid(),
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            filename VARCHAR(512) NOT NULL,
+            file_size INTEGER,
+            collection_name VARCHAR(255) NOT NULL,
+            chunk_count INTEGER DEFAULT 0,
+            embedding_model VARCHAR(255),
+            created_at TIMESTAMP DEFAULT NOW()
+        );
+
+        -- Chat logs table to store conversation history.
+        CREATE TABLE IF NOT EXISTS chat_logs (
+            id SERIAL PRIMARY KEY,
+            uuid UUID UNIQUE NOT NULL DEFAULT gen_random_uuid(),
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            workflow_uuid UUID,
+            message TEXT NOT NULL,
+            response TEXT NOT NULL,
+            provider VARCHAR(50),
+            context_used INTEGER DEFAULT 0,
+            web_used BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT NOW(),
+            FOREIGN KEY (workflow_uuid) REFERENCES workflows(uuid) ON DELETE SET NULL
+        );
+
+        -- Execution logs table to track workflow execution details.
+        CREATE TABLE IF NOT EXISTS execution_logs (
+            id SERIAL PRIMARY KEY,
+            uuid UUID UNIQUE NOT NULL DEFAULT gen_random_uuid(),
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            workflow_uuid UUID,
+            workflow_name VARCHAR(255),
+            status VARCHAR(50) NOT NULL,
+            message TEXT,
+            response TEXT,
+            provider VARCHAR(50),
+            execution_time_ms INTEGER,
+            error_message TEXT,
+            context_used INTEGER DEFAULT 0,
+            web_used BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT NOW(),
+            FOREIGN KEY (workflow_uuid) REFERENCES workflows(uuid) ON DELETE SET NULL
+        );
+
+        -- Upgrade databases created when uuid columns were VARCHAR(36). The
+        -- workflow_uuid foreign keys are dropped and re-added around the type change.
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'workflows' AND column_name = 'uuid' AND data_type = 'character varying'
+            ) THEN
+                ALTER TABLE chat_logs DROP CONSTRAINT IF EXISTS chat_logs_workflow_uuid_fkey;
+                ALTER TABLE execution_logs DROP CONSTRAINT IF EXISTS execution_logs_workflow_uuid_fkey;
+
+                ALTER TABLE users ALTER COLUMN uuid DROP DEFAULT,
+                    ALTER COLUMN uuid TYPE UUID USING uuid::uuid,
+                    ALTER COLUMN uuid SET DEFAULT gen_random_uuid();
+                ALTER TABLE workflows ALTER COLUMN uuid DROP DEFAULT,
+                    ALTER COLUMN uuid TYPE UUID USING uuid::uuid,
+                    ALTER COLUMN uuid SET DEFAULT gen_random_uuid();
+                ALTER TABLE documents ALTER COLUMN uuid DROP DEFAULT,
+                    ALTER COLUMN uuid TYPE UUID USING uuid::uuid,
+                    ALTER COLUMN uuid SET DEFAULT gen_random_uuid();
+                ALTER TABLE chat_logs ALTER COLUMN uuid DROP DEFAULT,
+                    ALTER COLUMN uuid TYPE UUID USING uuid::uuid,
+                    ALTER COLUMN uuid SET DEFAULT gen_random_uuid(),
+                    ALTER COLUMN workflow_uuid TYPE UUID USING workflow_uuid::uuid;
+                ALTER TABLE execution_logs ALTER COLUMN uuid DROP DEFAULT,
+                    ALTER COLUMN uuid TYPE UUID USING uuid::uuid,
+                    ALTER COLUMN uuid SET DEFAULT gen_random_uuid(),
+                    ALTER COLUMN workflow_uuid TYPE UUID USING workflow_uuid::uuid;
+
+                ALTER TABLE chat_logs ADD CONSTRAINT chat_logs_workflow_uuid_fkey
+                    FOREIGN KEY (workflow_uuid) REFERENCES workflows(uuid) ON DELETE SET NULL;
+                ALTER TABLE execution_logs ADD CONSTRAINT execution_logs_workflow_uuid_fkey
+                    FOREIGN KEY (workflow_uuid) REFERENCES workflows(uuid) ON DELETE SET NULL;
+            END IF;
+        END $$;
+
+        -- Indexes backing the per-user / per-workflow list queries (filter + newest first).
+        CREATE INDEX IF NOT EXISTS idx_workflows_user_updated ON workflows (user_id, updated_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_documents_user_created ON documents (user_id, created_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_chat_logs_user_created ON chat_logs (user_id, created_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_chat_logs_workflow_created ON chat_logs (workflow_uuid, created_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_execution_logs_user_created ON execution_logs (user_id, created_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_documents_collection_created ON documents (collection_name, created_at DESC);
+        -- Unfiltered listings (anonymous callers) sort the whole table.
+        CREATE INDEX IF NOT EXISTS idx_workflows_updated ON workflows (updated_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_chat_logs_created ON chat_logs (created_at DESC);
+        """
+    )
+    # Record the applied version on the users table (COMMENT takes no bind parameters).
+    await conn.execute(f"COMMENT ON TABLE users IS '{SCHEMA_VERSION}'")
+
+
+async def get_pool() -> asyncpg.Pool:
+    """
+    Get the database connection pool.
+    Falls back to lazy initialization where startup events don't run (serverless).
+    """
     if _pool is None:
-        _pool = await init_db()
+        return await init_db()
     return _pool
 
 
@@ -138,20 +292,37 @@ async def save_workflow(name: str, description: str, nodes: List[Dict[str, Any]]
         row = await conn.fetchrow(
             """
             INSERT INTO workflows (name, description, nodes, edges, user_id)
-            VALUES ($1, $2, $3::jsonb, $4::jsonb, $5)
+            VALUES ($1, $2, $3, $4, $5)
             RETURNING id, uuid, name, description, created_at, updated_at
             """,
             name,
             description or "",
-            json.dumps(nodes),
-            json.dumps(edges),
+            nodes,
+            edges,
             user_id,
         )
     return dict(row) if row else {}
 
 
+WORKFLOW_IMPORT_COLUMNS = ("name", "description", "nodes", "edges", "user_id")
+
+
+async def save_workflows_bulk(records: List[Tuple[Any, ...]]) -> int:
+    """
+    Insert many workflows at once (e.g. an import) using binary COPY.
+    Each record is ordered as WORKFLOW_IMPORT_COLUMNS; returns the number of rows copied.
+    """
+    if not records:
+        return 0
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        result = await conn.copy_records_to_table("workflows", records=records, columns=WORKFLOW_IMPORT_COLUMNS)
+    # result is the COPY command tag, e.g. "COPY 12".
+    return int(result.rsplit(" ", 1)[-1])
+
+
 async def update_workflow(
-    uuid: str, name: str, description: str, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]
+    uuid: UUID, name: str, description: str, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]
 ) -> Dict[str, Any]:
     """Update an existing workflow by uuid."""
     pool = await get_pool()
@@ -159,54 +330,53 @@ async def update_workflow(
         row = await conn.fetchrow(
             """
             UPDATE workflows
-            SET name = $1, description = $2, nodes = $3::jsonb, edges = $4::jsonb, updated_at = NOW()
+            SET name = $1, description = $2, nodes = $3, edges = $4, updated_at = NOW()
             WHERE uuid = $5
             RETURNING id, uuid, name, description, created_at, updated_at
             """,
             name,
             description or "",
-            json.dumps(nodes),
-            json.dumps(edges),
+            nodes,
+            edges,
             uuid,
         )
     return dict(row) if row else {}
 
 
-async def get_workflow(uuid: str) -> Optional[Dict[str, Any]]:
+async def get_workflow(uuid: UUID) -> Optional[Dict[str, Any]]:
     """Retrieve a workflow by uuid."""
     pool = await get_pool()
     async with pool.acquire() as conn:
-        row = await conn.fetchrow("SELECT id, uuid, name, description, nodes, edges, created_at, updated_at FROM workflows WHERE uuid = $1", uuid)
-    if not row:
-        return None
-    result = dict(row)
-    # Parse JSON fields back from JSONB.
-    result["nodes"] = json.loads(result["nodes"]) if isinstance(result["nodes"], str) else result["nodes"]
-    result["edges"] = json.loads(result["edges"]) if isinstance(result["edges"], str) else result["edges"]
-    return result
+        row = await conn.fetchrow(SQL_GET_WORKFLOW, uuid)
+    # nodes/edges arrive already decoded by the orjson JSONB codec.
+    return dict(row) if row else None
 
 
-async def list_workflows(user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+async def list_workflows(user_id: Optional[int] = None) -> List[asyncpg.Record]:
     """List all workflows (name, uuid, created/updated timestamps). Optionally filter by user."""
     pool = await get_pool()
     async with pool.acquire() as conn:
+        query = "SELECT uuid, name, description, created_at, updated_at FROM workflows WHERE 1=1"
+        params = []
+        param_count = 1
+        
         if user_id:
-            rows = await conn.fetch(
-                "SELECT uuid, name, description, created_at, updated_at FROM workflows WHERE user_id = $1 ORDER BY updated_at DESC",
-                user_id
-            )
-        else:
-            rows = await conn.fetch("SELECT uuid, name, description, created_at, updated_at FROM workflows ORDER BY updated_at DESC")
-    return [dict(row) for row in rows]
+            query += f" AND user_id = ${param_count}"
+            params.append(user_id)
+            param_count += 1
+        
+        query += " ORDER BY updated_at DESC"
+        
+        rows = await conn.fetch(query, *params)
+    return rows
 
 
-async def delete_workflow(uuid: str) -> bool:
+async def delete_workflow(uuid: UUID) -> bool:
     """Delete a workflow by uuid. Returns True if found and deleted."""
     pool = await get_pool()
     async with pool.acquire() as conn:
-        result = await conn.execute("DELETE FROM workflows WHERE uuid = $1", uuid)
-    # result is a string like "DELETE 1" or "DELETE 0"; parse the count.
-    return "1" in result
+        deleted = await conn.fetchval("DELETE FROM workflows WHERE uuid = $1 RETURNING id", uuid)
+    return deleted is not None
 
 
 async def save_document_metadata(
@@ -215,18 +385,20 @@ async def save_document_metadata(
     collection_name: str,
     chunk_count: int,
     embedding_model: Optional[str] = None,
-    user_id: Optional[int] = None
+    user_id: Optional[int] = None,
+    uuid: Optional[UUID] = None
 ) -> Dict[str, Any]:
     """
     Save document metadata to PostgreSQL after successful upload.
+    Pass uuid to assign it up front; otherwise the database generates one.
     Returns the created document record with uuid.
     """
     pool = await get_pool()
     async with pool.acquire() as conn:
         row = await conn.fetchrow(
             """
-            INSERT INTO documents (filename, file_size, collection_name, chunk_count, embedding_model, user_id)
-            VALUES ($1, $2, $3, $4, $5, $6)
+            INSERT INTO documents (filename, file_size, collection_name, chunk_count, embedding_model, user_id, uuid)
+            VALUES ($1, $2, $3, $4, $5, $6, COALESCE($7, gen_random_uuid()))
             RETURNING id, uuid, filename, collection_name, chunk_count, created_at
             """,
             filename,
@@ -235,42 +407,40 @@ async def save_document_metadata(
             chunk_count,
             embedding_model,
             user_id,
+            uuid,
         )
     return dict(row) if row else {}
 
 
-async def list_documents(collection_name: Optional[str] = None, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+async def list_documents(collection_name: Optional[str] = None, user_id: Optional[int] = None) -> List[asyncpg.Record]:
     """
     List document metadata. Optionally filter by collection name and/or user_id.
     Returns list of documents with their upload info.
     """
     pool = await get_pool()
     async with pool.acquire() as conn:
-        if collection_name and user_id:
-            rows = await conn.fetch(
-                "SELECT uuid, filename, file_size, collection_name, chunk_count, created_at FROM documents WHERE collection_name = $1 AND user_id = $2 ORDER BY created_at DESC",
-                collection_name,
-                user_id
-            )
-        elif collection_name:
-            rows = await conn.fetch(
-                "SELECT uuid, filename, file_size, collection_name, chunk_count, created_at FROM documents WHERE collection_name = $1 ORDER BY created_at DESC",
-                collection_name
-            )
-        elif user_id:
-            rows = await conn.fetch(
-                "SELECT uuid, filename, file_size, collection_name, chunk_count, created_at FROM documents WHERE user_id = $1 ORDER BY created_at DESC",
-                user_id
-            )
-        else:
-            rows = await conn.fetch(
-                "SELECT uuid, filename, file_size, collection_name, chunk_count, created_at FROM documents ORDER BY created_at DESC"
-            )
-    return [dict(row) for row in rows]
+        query = "SELECT uuid, filename, file_size, collection_name, chunk_count, created_at FROM documents WHERE 1=1"
+        params = []
+        param_count = 1
+        
+        if collection_name:
+            query += f" AND collection_name = ${param_count}"
+            params.append(collection_name)
+            param_count += 1
+        
+        if user_id:
+            query += f" AND user_id = ${param_count}"
+            params.append(user_id)
+            param_count += 1
+        
+        query += " ORDER BY created_at DESC"
+        
+        rows = await conn.fetch(query, *params)
+    return rows
 
 
 async def save_chat_log(
-    workflow_uuid: Optional[str],
+    workflow_uuid: Optional[UUID],
     message: str,
     response: str,
     provider: str,
@@ -301,38 +471,109 @@ async def save_chat_log(
     return dict(row) if row else {}
 
 
-async def list_chat_logs(workflow_uuid: Optional[str] = None, user_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
+# ===== Background chat-log writer =====
+# Chat logs are best-effort audit data, so /chat/run hands them to a queue and a
+# background task inserts them in batches instead of awaiting a write per reply.
+
+CHAT_LOG_COLUMNS = ("workflow_uuid", "message", "response", "provider", "context_used", "web_used", "user_id")
+_CHAT_LOG_BATCH_SIZE = 200
+_chat_log_queue: asyncio.Queue = asyncio.Queue(maxsize=10_000)
+_chat_log_flusher: asyncio.Task | None = None
+
+
+async def _write_chat_logs(records: List[Tuple[Any, ...]]) -> None:
+    """Insert a batch of chat-log tuples (ordered as CHAT_LOG_COLUMNS) with one binary COPY."""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await conn.copy_records_to_table("chat_logs", records=records, columns=CHAT_LOG_COLUMNS)
+
+
+async def _flush_chat_logs() -> None:
+    """Drain the queue in batches until the shutdown sentinel (None) arrives."""
+    stopping = False
+    while not stopping:
+        batch = []
+        item = await _chat_log_queue.get()
+        while True:
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+            if len(batch) >= _CHAT_LOG_BATCH_SIZE or _chat_log_queue.empty():
+                break
+            item = _chat_log_queue.get_nowait()
+        if batch:
+            try:
+                await _write_chat_logs(batch)
+            except Exception:
+                logger.exception("Dropping %d chat log(s) after a failed batch insert", len(batch))
+
+
+def start_chat_log_flusher() -> None:
+    """Start the background chat-log writer (called at application startup)."""
+    global _chat_log_flusher
+    if _chat_log_flusher is None:
+        _chat_log_flusher = asyncio.create_task(_flush_chat_logs())
+
+
+async def stop_chat_log_flusher() -> None:
+    """Write out anything still queued and stop the background writer."""
+    global _chat_log_flusher
+    if _chat_log_flusher is not None:
+        await _chat_log_queue.put(None)
+        await _chat_log_flusher
+        _chat_log_flusher = None
+
+
+async def enqueue_chat_log(
+    workflow_uuid: Optional[UUID],
+    message: str,
+    response: str,
+    provider: str,
+    context_used: int = 0,
+    web_used: bool = False,
+    user_id: Optional[int] = None
+) -> None:
+    """
+    Queue a chat interaction for the background writer.
+    Writes inline when no writer is running (serverless) or the queue is full.
+    """
+    record = (workflow_uuid, message, response, provider, context_used, web_used, user_id)
+    if _chat_log_flusher is not None:
+        try:
+            _chat_log_queue.put_nowait(record)
+            return
+        except asyncio.QueueFull:
+            pass
+    await _write_chat_logs([record])
+
+
+async def list_chat_logs(workflow_uuid: Optional[UUID] = None, user_id: Optional[int] = None, limit: int = 50) -> List[asyncpg.Record]:
     """
     Retrieve chat history. Optionally filter by workflow uuid and/or user_id.
     Returns recent chat logs sorted by timestamp.
     """
     pool = await get_pool()
     async with pool.acquire() as conn:
-        if workflow_uuid and user_id:
-            rows = await conn.fetch(
-                "SELECT uuid, message, response, provider, context_used, web_used, created_at FROM chat_logs WHERE workflow_uuid = $1 AND user_id = $2 ORDER BY created_at DESC LIMIT $3",
-                workflow_uuid,
-                user_id,
-                limit
-            )
-        elif workflow_uuid:
-            rows = await conn.fetch(
-                "SELECT uuid, message, response, provider, context_used, web_used, created_at FROM chat_logs WHERE workflow_uuid = $1 ORDER BY created_at DESC LIMIT $2",
-                workflow_uuid,
-                limit
-            )
-        elif user_id:
-            rows = await conn.fetch(
-                "SELECT uuid, message, response, provider, context_used, web_used, created_at FROM chat_logs WHERE user_id = $1 ORDER BY created_at DESC LIMIT $2",
-                user_id,
-                limit
-            )
-        else:
-            rows = await conn.fetch(
-                "SELECT uuid, message, response, provider, context_used, web_used, created_at FROM chat_logs ORDER BY created_at DESC LIMIT $1",
-                limit
-            )
-    return [dict(row) for row in rows]
+        query = "SELECT uuid, message, response, provider, context_used, web_used, created_at FROM chat_logs WHERE 1=1"
+        params = []
+        param_count = 1
+        
+        if workflow_uuid:
+            query += f" AND workflow_uuid = ${param_count}"
+            params.append(workflow_uuid)
+            param_count += 1
+        
+        if user_id:
+            query += f" AND user_id = ${param_count}"
+            params.append(user_id)
+            param_count += 1
+        
+        query += f" ORDER BY created_at DESC LIMIT ${param_count}"
+        params.append(min(limit, MAX_LIST_ROWS))
+        
+        rows = await conn.fetch(query, *params)
+    return rows
 
 
 # ===== User Authentication Functions =====
@@ -354,6 +595,8 @@ async def create_user(username: str, email: str, hashed_password: str) -> Dict[s
             email,
             hashed_password,
         )
+    if row:
+        invalidate_user_cache(row["id"])
     return dict(row) if row else {}
 
 
@@ -361,10 +604,7 @@ async def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
     """Retrieve a user by username for authentication."""
     pool = await get_pool()
     async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT id, uuid, username, email, hashed_password, is_active, created_at FROM users WHERE username = $1",
-            username
-        )
+        row = await conn.fetchrow(SQL_GET_USER_BY_USERNAME, username)
     return dict(row) if row else None
 
 
@@ -372,29 +612,49 @@ async def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     """Retrieve a user by email."""
     pool = await get_pool()
     async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT id, uuid, username, email, hashed_password, is_active, created_at FROM users WHERE email = $1",
-            email
-        )
+        row = await conn.fetchrow(SQL_GET_USER_BY_EMAIL, email)
     return dict(row) if row else None
 
 
 async def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
-    """Retrieve a user by their ID."""
+    """Retrieve a user by their ID. Results are cached for a short TTL."""
+    now = time.time()
+    cached = _user_cache.get(user_id)
+    if cached:
+        expires_at, user = cached
+        if expires_at > now:
+            return dict(user)
+        del _user_cache[user_id]
+
     pool = await get_pool()
     async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT id, uuid, username, email, is_active, created_at FROM users WHERE id = $1",
-            user_id
+        row = await conn.fetchrow(SQL_GET_USER_BY_ID, user_id)
+    if not row:
+        return None
+
+    user = dict(row)
+    if len(_user_cache) >= _USER_CACHE_MAX_SIZE:
+        _user_cache.pop(next(iter(_user_cache)))
+    _user_cache[user_id] = (now + _USER_CACHE_TTL, user)
+    return dict(user)
+
+
+async def update_user_password_hash(user_id: int, hashed_password: str) -> None:
+    """Replace a user's stored password hash (e.g. upgrading a legacy bcrypt hash)."""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await conn.execute(
+            "UPDATE users SET hashed_password = $2, updated_at = NOW() WHERE id = $1",
+            user_id,
+            hashed_password,
         )
-    return dict(row) if row else None
 
 
 # ===== Execution Logs Functions =====
 
 async def save_execution_log(
     user_id: Optional[int],
-    workflow_uuid: Optional[str],
+    workflow_uuid: Optional[UUID],
     workflow_name: Optional[str],
     status: str,
     message: Optional[str] = None,
@@ -434,10 +694,10 @@ async def save_execution_log(
 
 async def list_execution_logs(
     user_id: Optional[int] = None,
-    workflow_uuid: Optional[str] = None,
+    workflow_uuid: Optional[UUID] = None,
     status: Optional[str] = None,
     limit: int = 100
-) -> List[Dict[str, Any]]:
+) -> List[asyncpg.Record]:
     """
     Retrieve execution logs. Can filter by user_id, workflow_uuid, and/or status.
     Returns recent execution logs sorted by timestamp.
@@ -464,7 +724,7 @@ async def list_execution_logs(
             param_count += 1
         
         query += f" ORDER BY created_at DESC LIMIT ${param_count}"
-        params.append(limit)
+        params.append(min(limit, MAX_LIST_ROWS))
         
         rows = await conn.fetch(query, *params)
-    return [dict(row) for row in rows]
+    return rows
@@ -1,19 +1,29 @@
-
 import asyncio
+import concurrent.futures
+import hashlib
+import importlib.util
 import io
-from collections import defaultdict, deque
-from typing import Any, Dict, List, Optional
-from uuid import uuid4
+import os
+import queue
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+import tempfile
 import time
 
+import asyncpg
 import chromadb
 import fitz  # PyMuPDF
 import google.generativeai as genai
-from fastapi import FastAPI, File, HTTPException, UploadFile, Request, Depends
+import httpx
+import numpy as np
+import orjson
+from fastapi import BackgroundTasks, FastAPI, File, HTTPException, UploadFile, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from openai import AsyncOpenAI
-from pydantic import BaseModel, ConfigDict, Field
-from serpapi import GoogleSearch
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -21,8 +31,10 @@ from chromadb.api import ClientAPI
 
 from .config import Settings, get_settings
 from .database import (
+    close_db,
     create_user,
     delete_workflow,
+    enqueue_chat_log,
     get_user_by_email,
     get_user_by_username,
     get_workflow,
@@ -31,10 +43,11 @@ from .database import (
     list_documents,
     list_execution_logs,
     list_workflows,
-    save_chat_log,
     save_document_metadata,
     save_execution_log,
     save_workflow,
+    start_chat_log_flusher,
+    stop_chat_log_flusher,
     update_workflow,
 )
 from .auth import (
@@ -48,7 +61,31 @@ from .auth import (
 # FastAPI initialization with proper CORS configuration
 settings = get_settings()
 
-app = FastAPI(title="Workflow Builder API", version="0.3.0")
+# orjson serializes the UUID/datetime-heavy list responses much faster than stdlib json.
+app = FastAPI(title="Workflow Builder API", version="0.3.0", default_response_class=ORJSONResponse)
+
+
+def _orjson_default(obj: Any) -> Any:
+    if isinstance(obj, asyncpg.Record):
+        return dict(obj)
+    # asyncpg decodes UUID columns to its own uuid.UUID subclass, which orjson only
+    # serializes natively for the exact uuid.UUID type.
+    if isinstance(obj, UUID):
+        return str(obj)
+    raise TypeError
+
+
+class RecordJSONResponse(ORJSONResponse):
+    """
+    ORJSONResponse that also understands asyncpg Records. List endpoints return it
+    directly so rows go straight to orjson instead of through jsonable_encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
 
 # Configure CORS with environment-based origins
 app.add_middleware(
@@ -59,93 +96,71 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
+# Compress larger JSON bodies (chat/execution logs, workflow lists); also applies behind Mangum.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Initialize rate limiter (the single place per-IP request limits are tracked)
+limiter = Limiter(key_func=get_remote_address, enabled=settings.rate_limit_enabled)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
-# Store for tracking request timestamps per IP (for throttling)
-_request_timestamps: Dict[str, List[float]] = {}
-_collection_request_timestamps: Dict[str, List[float]] = {}
-_last_cleanup = time.time()
-
-
-async def cleanup_old_timestamps():
-    """Remove old IP entries from timestamp tracking to prevent memory leak."""
-    global _last_cleanup, _request_timestamps, _collection_request_timestamps
-    current_time = time.time()
-    
-    # Cleanup every 5 minutes
-    if current_time - _last_cleanup < 300:
-        return
-    
-    _last_cleanup = current_time
-    
-    # Remove IPs with no recent activity (older than 1 hour)
-    cutoff_time = current_time - 3600
-    
-    ips_to_remove = [ip for ip, timestamps in _request_timestamps.items() if timestamps and timestamps[-1] < cutoff_time]
-    for ip in ips_to_remove:
-        del _request_timestamps[ip]
-    
-    ips_to_remove = [ip for ip, timestamps in _collection_request_timestamps.items() if timestamps and timestamps[-1] < cutoff_time]
-    for ip in ips_to_remove:
-        del _collection_request_timestamps[ip]
-
-
 # Initialize database on startup.
 @app.on_event("startup")
 async def startup_db():
-    """Set up PostgreSQL pool when the API starts."""
+    """Set up PostgreSQL pool and background writers when the API starts."""
     await init_db()
+    start_chat_log_flusher()
+    if not get_settings().openai_api_key and importlib.util.find_spec("sentence_transformers"):
+        # Embeddings fall back to Hugging Face; load the model now rather than on the first upload.
+        start_hf_worker()
 
 
-# Singletons for heavier resources; keep them module-level to avoid reloading per request.
-_chroma_client: ClientAPI | None = None
-_hf_model = None
+@app.on_event("shutdown")
+async def shutdown_db():
+    """Flush queued chat logs, then release PostgreSQL and outbound HTTP connections when the API stops."""
+    await stop_chat_log_flusher()
+    await close_db()
+    if _http_client is not None:
+        await _http_client.aclose()
 
 
-async def check_throttle(client_ip: str, endpoint: str = "general") -> bool:
-    """
-    Check if client has exceeded throttle limits.
-    Returns True if request should be allowed, False if throttled.
-    """
-    # Cleanup old timestamps periodically to prevent memory leak
-    await cleanup_old_timestamps()
-    
-    if not settings.throttle_enabled:
-        return True
-    
-    current_time = time.time()
-    
-    if endpoint == "collections":
-        timestamps = _collection_request_timestamps.get(client_ip, [])
-        min_interval = 60 / settings.collection_endpoint_rate_limit  # Convert rate to seconds
-    else:
-        timestamps = _request_timestamps.get(client_ip, [])
-        min_interval = settings.throttle_delay
-    
-    # Remove timestamps older than 1 minute
-    timestamps = [ts for ts in timestamps if current_time - ts < 60]
-    
-    if timestamps:
-        time_since_last = current_time - timestamps[-1]
-        if time_since_last < min_interval:
-            return False
-    
-    # Record this request
-    timestamps.append(current_time)
-    if endpoint == "collections":
-        _collection_request_timestamps[client_ip] = timestamps
-    else:
-        _request_timestamps[client_ip] = timestamps
-    
-    return True
+# Singletons for heavier resources; keep them module-level to avoid reloading per request.
+_chroma_client: ClientAPI | None = None
+_chroma_collections: Dict[str, Any] = {}
+_openai_client: AsyncOpenAI | None = None
+_gemini_configured = False
+_gemini_models: Dict[str, genai.GenerativeModel] = {}
+_http_client: httpx.AsyncClient | None = None
+
+# Memoized results for repeat chat queries. Embeddings are deterministic per model,
+# so they only need an LRU bound; web results drift, so they also expire.
+_QUERY_EMBEDDING_CACHE_MAX_SIZE = 1024
+_query_embedding_cache: Dict[Tuple[str, Optional[str]], List[float]] = {}
+_WEB_SEARCH_CACHE_TTL = 1800  # seconds
+_WEB_SEARCH_CACHE_MAX_SIZE = 256
+_web_search_cache: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+# LLM answers keyed by a digest of provider, model, history and the final prompt.
+# The prompt already embeds retrieved context, so a hit means identical LLM input.
+_ANSWER_CACHE_TTL = 600  # seconds
+_ANSWER_CACHE_MAX_SIZE = 512
+_answer_cache: Dict[str, Tuple[float, str]] = {}
+# Small collections are searched in memory: all vectors as one normalized float32 matrix
+# plus their documents, keyed by collection name. None marks a collection too big for it.
+# Local writes bump the collection's generation and drop its entry; the TTL picks up
+# writes from other processes. Total resident size is capped by bytes, not entries.
+_MATRIX_SEARCH_MAX_ROWS = 5000
+_MATRIX_CACHE_TTL = 60  # seconds
+_MATRIX_CACHE_MAX_BYTES = 48 * 1024 * 1024
+_MATRIX_CACHE_MAX_SIZE = 64  # entries, mostly to bound "too big" markers
+# name -> (expires_at, matrix or None, documents, approximate bytes)
+_collection_matrices: Dict[str, Tuple[float, Optional[np.ndarray], List[str], int]] = {}
+_collection_generations: Dict[str, int] = {}
 
 
 class ComponentConfig(BaseModel):
     # Generic config bag for nodes; real shape depends on component type.
-    model_config = ConfigDict(extra="allow")
+    # Unknown keys are dropped; the UI only sends and reloads the fields below.
+    model_config = ConfigDict(extra="ignore")
 
     id: str
     type: str
@@ -154,11 +169,16 @@ class ComponentConfig(BaseModel):
 
 
 class Edge(BaseModel):
-    model_config = ConfigDict(extra="allow")
+    # React Flow edge; the declared fields are the ones the canvas needs to redraw it.
+    model_config = ConfigDict(extra="ignore")
 
     id: Optional[str] = None
     source: str
     target: str
+    sourceHandle: Optional[str] = None
+    targetHandle: Optional[str] = None
+    type: Optional[str] = None
+    animated: Optional[bool] = None
     data: Dict[str, Any] = Field(default_factory=dict)
 
 
@@ -168,6 +188,11 @@ class WorkflowDefinition(BaseModel):
     edges: List[Edge]
 
 
+# Serializers for whole node/edge lists, used when persisting workflows.
+_NODE_LIST = TypeAdapter(List[ComponentConfig])
+_EDGE_LIST = TypeAdapter(List[Edge])
+
+
 class ChatRequest(BaseModel):
     # Payload for running the workflow in chat mode.
     workflow: WorkflowDefinition
@@ -184,88 +209,481 @@ def get_chroma_client(settings: Settings) -> chromadb.Client:
     return _chroma_client
 
 
+def get_openai_client(settings: Settings) -> AsyncOpenAI:
+    """Singleton OpenAI client so its HTTP connection pool is reused across requests."""
+
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(api_key=settings.openai_api_key)
+    return _openai_client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared async HTTP client for outbound calls (keep-alive connections are reused)."""
+
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=10, limits=httpx.Limits(max_keepalive_connections=20))
+    return _http_client
+
+
+def get_gemini_model(settings: Settings, model_name: str) -> genai.GenerativeModel:
+    """Configure Gemini once and reuse one model handle per model name."""
+
+    global _gemini_configured
+    if not _gemini_configured:
+        genai.configure(api_key=settings.gemini_api_key)
+        _gemini_configured = True
+    model = _gemini_models.get(model_name)
+    if model is None:
+        model = _gemini_models[model_name] = genai.GenerativeModel(model_name)
+    return model
+
+
 def get_chroma_collection(settings: Settings, collection_name: str):
-    """Create or reuse a Chroma collection for embeddings."""
+    """Create or reuse a Chroma collection for embeddings (handles cached per name)."""
 
-    client = get_chroma_client(settings)
-    return client.get_or_create_collection(collection_name)
+    collection = _chroma_collections.get(collection_name)
+    if collection is None:
+        client = get_chroma_client(settings)
+        collection = _chroma_collections[collection_name] = client.get_or_create_collection(collection_name)
+    return collection
+
+
+# Single-pass translation table: line breaks become spaces before chunking.
+_NEWLINES_TO_SPACES = str.maketrans({"\r": " ", "\n": " "})
 
 
 def chunk_text(text: str, chunk_size: int = 800, overlap: int = 80) -> List[str]:
     """Simple sliding window chunker to keep context manageable for embeddings."""
 
-    cleaned = text.replace("\r", " ").replace("\n", " ")
-    chunks = []
-    start = 0
-    while start < len(cleaned):
-        end = start + chunk_size
-        chunks.append(cleaned[start:end])
-        start = end - overlap
-    return [c.strip() for c in chunks if c.strip()]
+    step = chunk_size - overlap
+    if chunk_size <= 0 or step <= 0:
+        raise HTTPException(status_code=400, detail="chunk_size must be positive and larger than chunk_overlap")
+
+    cleaned = text.translate(_NEWLINES_TO_SPACES)
+    chunks = (cleaned[start:start + chunk_size].strip() for start in range(0, len(cleaned), step))
+    return [c for c in chunks if c]
+
+
+# Plain-text extraction for chunking: keep on-page text and rejoin hyphenated line breaks,
+# but skip ligature/whitespace preservation that embeddings don't need.
+_PDF_TEXT_FLAGS = fitz.TEXT_MEDIABOX_CLIP | fitz.TEXT_DEHYPHENATE
+
+
+def _extract_text(doc: fitz.Document) -> str:
+    pages = (page.get_text("text", sort=False, flags=_PDF_TEXT_FLAGS) for page in doc)
+    # Scanned/image-only pages come back blank; drop them instead of joining empty runs.
+    return "\n".join(text for text in pages if text.strip()).strip()
 
 
 def extract_text_from_pdf_bytes(data: bytes) -> str:
-    """Pull text from a PDF using PyMuPDF."""
+    """Pull text from an in-memory PDF using PyMuPDF."""
 
     with fitz.open(stream=data, filetype="pdf") as doc:
-        pages = [page.get_text() for page in doc]
-    return "\n".join(pages).strip()
+        return _extract_text(doc)
 
 
-async def embed_with_hf(texts: List[str], model_name: Optional[str]) -> List[List[float]]:
-    """Hugging Face fallback embedding (runs in a worker thread)."""
+def extract_text_from_pdf_path(path: str) -> str:
+    """Pull text from a PDF on disk; PyMuPDF loads pages on demand."""
+
+    with fitz.open(path, filetype="pdf") as doc:
+        return _extract_text(doc)
+
+
+_UPLOAD_READ_SIZE = 1024 * 1024  # bytes copied per read when spooling uploads to disk
+
+
+async def spool_upload(file: UploadFile, destination) -> int:
+    """Copy an upload to an open binary file in fixed-size reads; returns bytes written."""
+
+    size = 0
+    while chunk := await file.read(_UPLOAD_READ_SIZE):
+        destination.write(chunk)
+        size += len(chunk)
+    destination.flush()
+    return size
+
+
+# All SentenceTransformer work for a model runs on that model's dedicated thread: models
+# aren't safe to call concurrently, and requests arriving close together share a single
+# forward pass. Each requested model name gets its own worker, so a request never
+# receives vectors from a different model than the one it asked for.
+_HF_DEFAULT_MODEL = "all-MiniLM-L6-v2"
+_HF_BATCH_WINDOW = 0.064  # seconds to wait for more requests before encoding
+_HF_MAX_REQUESTS_PER_BATCH = 32
+# Each loaded model stays resident, so only a few distinct models may run at once.
+_HF_MAX_MODELS = 3
+_hf_queues: Dict[str, queue.Queue] = {}
+_hf_workers: Dict[str, threading.Thread] = {}
+_hf_worker_lock = threading.Lock()
+
+
+def _collect_hf_batch(requests: queue.Queue) -> List[Tuple[List[str], concurrent.futures.Future]]:
+    """Block for the next request, then gather whatever else arrives within the batch window."""
+
+    pending = []
+    item = requests.get()
+    deadline = time.monotonic() + _HF_BATCH_WINDOW
+    while True:
+        # Claiming marks the future running, so a later cancel from the awaiting
+        # request can't race with set_result; already-cancelled requests are dropped.
+        if item[1].set_running_or_notify_cancel():
+            pending.append(item)
+        remaining = deadline - time.monotonic()
+        if len(pending) >= _HF_MAX_REQUESTS_PER_BATCH or remaining <= 0:
+            return pending
+        try:
+            item = requests.get(timeout=remaining)
+        except queue.Empty:
+            return pending
+
+
+def _encode_hf_batch(model, pending: List[Tuple[List[str], concurrent.futures.Future]]) -> None:
+    """Encode one combined batch and hand each request its slice of the vectors."""
+
+    try:
+        texts = [text for request_texts, _ in pending for text in request_texts]
+        vectors = model.encode(texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False).tolist()
+    except Exception as exc:
+        for _, future in pending:
+            future.set_exception(exc)
+        return
+
+    offset = 0
+    for request_texts, future in pending:
+        future.set_result(vectors[offset:offset + len(request_texts)])
+        offset += len(request_texts)
+
+
+def _hf_loop(model_name: str, requests: queue.Queue) -> None:
+    """Worker thread: load one model, then encode its queued requests in combined batches."""
 
-    global _hf_model
+    error: BaseException = RuntimeError(f"Hugging Face embedding worker for {model_name} stopped")
     try:
         from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(model_name)
+        while True:
+            pending = _collect_hf_batch(requests)
+            if pending:
+                _encode_hf_batch(model, pending)
+    except Exception as exc:
+        error = exc
+    finally:
+        # However the worker stops, fail everything still queued and let the next
+        # request for this model start a fresh one, so no caller waits forever.
+        with _hf_worker_lock:
+            _hf_workers.pop(model_name, None)
+            _hf_queues.pop(model_name, None)
+        while not requests.empty():
+            _, future = requests.get_nowait()
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+
+def _ensure_hf_worker(model_name: str) -> queue.Queue:
+    """Start the model's worker if it isn't running and return its queue. Caller must hold _hf_worker_lock."""
+
+    requests = _hf_queues.get(model_name)
+    if requests is None:
+        requests = _hf_queues[model_name] = queue.Queue()
+        worker = _hf_workers[model_name] = threading.Thread(
+            target=_hf_loop, args=(model_name, requests), name=f"hf-embedder-{model_name}", daemon=True
+        )
+        worker.start()
+    return requests
+
+
+def start_hf_worker(model_name: Optional[str] = None) -> None:
+    """Begin loading an embedding model in the background so no request pays for it."""
+
+    with _hf_worker_lock:
+        _ensure_hf_worker(model_name or _HF_DEFAULT_MODEL)
+
+
+def _submit_to_hf_worker(texts: List[str], model_name: Optional[str]) -> concurrent.futures.Future:
+    """Queue texts for the worker of the requested model, starting it on first use."""
+
+    model_name = model_name or _HF_DEFAULT_MODEL
+    future: concurrent.futures.Future = concurrent.futures.Future()
+    with _hf_worker_lock:
+        if model_name not in _hf_queues and len(_hf_queues) >= _HF_MAX_MODELS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Embedding model {model_name} is not loaded; {', '.join(_hf_queues)} already in use",
+            )
+        _ensure_hf_worker(model_name).put((texts, future))
+    return future
+
+
+async def embed_with_hf(texts: List[str], model_name: Optional[str]) -> List[List[float]]:
+    """Hugging Face fallback embedding (batched on the dedicated worker thread)."""
+
+    try:
+        import sentence_transformers  # noqa: F401
     except ImportError as exc:  # pragma: no cover - defensive for missing dep
         raise HTTPException(status_code=500, detail="sentence-transformers is not installed") from exc
 
-    if _hf_model is None:
-        _hf_model = SentenceTransformer(model_name or "all-MiniLM-L6-v2")
+    if not texts:
+        return []
+
+    return await asyncio.wrap_future(_submit_to_hf_worker(texts, model_name))
 
-    def _encode() -> List[List[float]]:
-        vectors = _hf_model.encode(texts, convert_to_numpy=False, show_progress_bar=False)
-        return [v.tolist() if hasattr(v, "tolist") else list(v) for v in vectors]
 
-    return await asyncio.to_thread(_encode)
+# embed_and_upsert embeds documents above _EMBED_SINGLE_REQUEST_MAX chunks as
+# concurrent _EMBED_BATCH_SIZE requests.
+_EMBED_SINGLE_REQUEST_MAX = 256
+_EMBED_BATCH_SIZE = 128
+# Process-wide cap on in-flight embedding requests so concurrent uploads stay
+# inside the provider's rate limits.
+_EMBED_MAX_CONCURRENCY = 8
+_embed_semaphore = asyncio.Semaphore(_EMBED_MAX_CONCURRENCY)
 
 
 async def embed_texts(texts: List[str], settings: Settings, embedding_model: Optional[str] = None) -> List[List[float]]:
     """Embed text via OpenAI first; fall back to Hugging Face if no key."""
 
     if settings.openai_api_key:
-        client = AsyncOpenAI(api_key=settings.openai_api_key)
+        client = get_openai_client(settings)
         response = await client.embeddings.create(model=embedding_model or "text-embedding-3-small", input=texts)
         return [item.embedding for item in response.data]
 
     return await embed_with_hf(texts, embedding_model)
 
 
-async def upsert_documents(collection, documents: List[str], embeddings: List[List[float]]) -> List[str]:
-    """Persist embeddings into Chroma."""
+# Chat queries to the OpenAI embeddings API are coalesced: queries for the same model
+# arriving within the window share one request instead of paying a round trip each.
+_QUERY_EMBED_BATCH_WINDOW = 0.01  # seconds
+_QUERY_EMBED_MAX_BATCH = 64
+_pending_query_embeds: Dict[Optional[str], List[Tuple[str, asyncio.Future]]] = {}
+_query_embed_tasks: set = set()
+
+
+async def _flush_query_embeds(batch: List[Tuple[str, asyncio.Future]], settings: Settings, embedding_model: Optional[str]) -> None:
+    """Wait out the batching window, then embed every query collected in it."""
+
+    await asyncio.sleep(_QUERY_EMBED_BATCH_WINDOW)
+    if _pending_query_embeds.get(embedding_model) is batch:
+        del _pending_query_embeds[embedding_model]
+
+    try:
+        vectors = await embed_texts([text for text, _ in batch], settings, embedding_model)
+    except Exception as exc:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(exc)
+        return
 
-    ids = [str(uuid4()) for _ in documents]
-    await asyncio.to_thread(collection.add, documents=documents, embeddings=embeddings, ids=ids)
+    for (_, future), vector in zip(batch, vectors):
+        if not future.done():  # the awaiting request may have been cancelled
+            future.set_result(vector)
+
+
+async def _embed_query_batched(text: str, settings: Settings, embedding_model: Optional[str]) -> List[float]:
+    """Queue one query into the current batch for its model and await its vector."""
+
+    future = asyncio.get_running_loop().create_future()
+    batch = _pending_query_embeds.get(embedding_model)
+    if batch is None:
+        batch = _pending_query_embeds[embedding_model] = []
+        task = asyncio.create_task(_flush_query_embeds(batch, settings, embedding_model))
+        _query_embed_tasks.add(task)
+        task.add_done_callback(_query_embed_tasks.discard)
+    batch.append((text, future))
+    if len(batch) >= _QUERY_EMBED_MAX_BATCH:
+        # Full: later queries start a new batch; this one still flushes on its timer.
+        del _pending_query_embeds[embedding_model]
+    return await future
+
+
+async def embed_query(text: str, settings: Settings, embedding_model: Optional[str] = None) -> List[float]:
+    """Embed a single chat query, reusing the vector for repeat queries (LRU)."""
+
+    key = (text, embedding_model)
+    cached = _query_embedding_cache.pop(key, None)
+    if cached is None:
+        if settings.openai_api_key:
+            cached = await _embed_query_batched(text, settings, embedding_model)
+        else:
+            # The HF worker thread already batches concurrent requests.
+            cached = (await embed_texts([text], settings, embedding_model))[0]
+        if len(_query_embedding_cache) >= _QUERY_EMBEDDING_CACHE_MAX_SIZE:
+            _query_embedding_cache.pop(next(iter(_query_embedding_cache)))
+    # Re-insert so the most recently used entry sits at the end.
+    _query_embedding_cache[key] = cached
+    return cached
+
+
+def normalize_embeddings(embeddings) -> np.ndarray:
+    """Pack vectors into one contiguous float32 array with unit L2 norm per row."""
+
+    vectors = np.array(embeddings, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    return vectors
+
+
+def new_chunk_ids(count: int) -> List[str]:
+    """Random uuid4-style ids from one urandom read instead of one per uuid4() call."""
+
+    raw = os.urandom(16 * count)
+    return [str(UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, len(raw), 16)]
+
+
+async def upsert_documents(
+    collection, documents: List[str], embeddings: List[List[float]], ids: Optional[List[str]] = None
+) -> List[str]:
+    """Persist embeddings into Chroma. Pass ids to know them before the insert starts."""
+
+    if ids is None:
+        ids = new_chunk_ids(len(documents))
+    vectors = normalize_embeddings(embeddings)
+    await asyncio.to_thread(collection.add, documents=documents, embeddings=vectors, ids=ids)
+    invalidate_collection_matrix(collection.name)
     return ids
 
 
+async def embed_and_upsert(
+    collection, documents: List[str], settings: Settings, embedding_model: Optional[str] = None
+) -> List[str]:
+    """Embed and store documents, inserting finished batches while later ones are still embedding."""
+
+    if len(documents) <= _EMBED_SINGLE_REQUEST_MAX:
+        embeddings = await embed_texts(documents, settings, embedding_model)
+        return await upsert_documents(collection, documents, embeddings)
+
+    # Chroma writes go through one at a time; embedding requests stay concurrent.
+    insert_lock = asyncio.Lock()
+    inserted: List[str] = []
+    inserts: List[asyncio.Task] = []
+
+    async def process(batch: List[str]) -> List[str]:
+        async with _embed_semaphore:
+            embeddings = await embed_texts(batch, settings, embedding_model)
+        async with insert_lock:
+            # Record the ids before inserting and shield the insert itself: if this task
+            # is cancelled mid-add, the rows still land, so the rollback must both know
+            # their ids and wait for the add to finish before deleting.
+            ids = new_chunk_ids(len(batch))
+            inserted.extend(ids)
+            insert = asyncio.ensure_future(upsert_documents(collection, batch, embeddings, ids))
+            inserts.append(insert)
+            return await asyncio.shield(insert)
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [
+                group.create_task(process(documents[i:i + _EMBED_BATCH_SIZE]))
+                for i in range(0, len(documents), _EMBED_BATCH_SIZE)
+            ]
+    except BaseException as exc:
+        # A batch failed (or the request was cancelled): don't leave a partial document
+        # behind. Ids that never reached Chroma are ignored by delete.
+        await asyncio.gather(*inserts, return_exceptions=True)
+        if inserted:
+            await asyncio.to_thread(collection.delete, ids=inserted)
+            invalidate_collection_matrix(collection.name)
+        if isinstance(exc, BaseExceptionGroup):
+            # Surface the first batch error itself so HTTPExceptions keep their status code.
+            raise exc.exceptions[0] from exc
+        raise
+
+    return [chunk_id for task in tasks for chunk_id in task.result()]
+
+
+def invalidate_collection_matrix(name: str) -> None:
+    """Forget the in-memory copy of a collection after writing to it."""
+
+    _collection_generations[name] = _collection_generations.get(name, 0) + 1
+    _collection_matrices.pop(name, None)
+
+
+def _load_collection_matrix(collection) -> Tuple[Optional[np.ndarray], List[str]]:
+    """Read every vector and document of a small collection (blocking; run in a thread)."""
+
+    if collection.count() > _MATRIX_SEARCH_MAX_ROWS:
+        return None, []
+    data = collection.get(include=["embeddings", "documents"])
+    documents = data.get("documents") or []
+    if not documents:
+        return np.empty((0, 0), dtype=np.float32), []
+    return normalize_embeddings(data["embeddings"]), documents
+
+
+def _cache_collection_matrix(name: str, expires_at: float, matrix: Optional[np.ndarray], documents: List[str]) -> None:
+    """Store a snapshot, evicting the oldest entries until it fits the byte budget."""
+
+    size = 0 if matrix is None else matrix.nbytes + sum(len(doc) for doc in documents)
+    if size > _MATRIX_CACHE_MAX_BYTES:
+        # Can never fit: remember to go straight to Chroma instead.
+        matrix, documents, size = None, [], 0
+
+    _collection_matrices.pop(name, None)
+    used = sum(entry[3] for entry in _collection_matrices.values())
+    while _collection_matrices and (
+        used + size > _MATRIX_CACHE_MAX_BYTES or len(_collection_matrices) >= _MATRIX_CACHE_MAX_SIZE
+    ):
+        used -= _collection_matrices.pop(next(iter(_collection_matrices)))[3]
+    _collection_matrices[name] = (expires_at, matrix, documents, size)
+
+
 async def query_collection(collection, query_embedding: List[float], top_k: int = 4) -> List[str]:
     """Retrieve the closest chunks for a query embedding."""
 
-    result = await asyncio.to_thread(collection.query, query_embeddings=[query_embedding], n_results=top_k)
-    docs = result.get("documents", [[]])
-    return docs[0] if docs else []
+    name = collection.name
+    now = time.time()
+    cached = _collection_matrices.get(name)
+    if cached is not None and cached[0] > now:
+        _, matrix, documents, _ = cached
+    else:
+        generation = _collection_generations.get(name, 0)
+        matrix, documents = await asyncio.to_thread(_load_collection_matrix, collection)
+        if _collection_generations.get(name, 0) != generation:
+            # A write landed while loading, so this snapshot may predate it. Don't
+            # cache it, and answer this query from Chroma.
+            matrix, documents = None, []
+        else:
+            _cache_collection_matrix(name, now + _MATRIX_CACHE_TTL, matrix, documents)
+
+    if matrix is None:
+        result = await asyncio.to_thread(
+            collection.query, query_embeddings=normalize_embeddings(query_embedding), n_results=top_k
+        )
+        docs = result.get("documents", [[]])
+        return docs[0] if docs else []
+
+    k = min(top_k, len(documents))
+    if k <= 0:
+        return []
+    # Rows are unit length, so the dot product ranks exactly like Chroma's L2 distance.
+    scores = matrix @ normalize_embeddings(query_embedding)[0]
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [documents[i] for i in top]
 
 
-def run_web_search(query: str, settings: Settings, max_results: int = 3) -> List[str]:
-    """Optional SerpAPI search to enrich context."""
+async def run_web_search(query: str, settings: Settings, max_results: int = 3) -> List[str]:
+    """Optional SerpAPI search to enrich context. Results are cached briefly per query."""
 
     if not settings.serpapi_key:
         return []
 
-    search = GoogleSearch({"api_key": settings.serpapi_key, "q": query})
-    data = search.get_dict()
+    key = (query, max_results)
+    now = time.time()
+    cached = _web_search_cache.get(key)
+    if cached and cached[0] > now:
+        return list(cached[1])
+
+    response = await get_http_client().get(
+        "https://serpapi.com/search",
+        params={"engine": "google", "q": query, "api_key": settings.serpapi_key, "output": "json"},
+    )
+    if not response.is_success:
+        # Web hints are optional; an API error just means no snippets (not cached).
+        return []
+    data = response.json()
     organic = data.get("organic_results") or []
     snippets = []
     for item in organic:
@@ -274,15 +692,18 @@ def run_web_search(query: str, settings: Settings, max_results: int = 3) -> List
             snippets.append(snippet)
         if len(snippets) >= max_results:
             break
-    return snippets
+
+    _web_search_cache.pop(key, None)
+    if len(_web_search_cache) >= _WEB_SEARCH_CACHE_MAX_SIZE:
+        _web_search_cache.pop(next(iter(_web_search_cache)))
+    _web_search_cache[key] = (now + _WEB_SEARCH_CACHE_TTL, snippets)
+    return list(snippets)
 
 
-def build_prompt(question: str, context: List[str], web_snippets: List[str], custom_prompt: Optional[str]) -> str:
-    """Assemble a simple RAG-style prompt."""
+def build_prompt(question: str, context: List[str], web_snippets: List[str]) -> str:
+    """Assemble a simple RAG-style prompt (the node's custom prompt goes to call_llm as system_prompt)."""
 
     parts: List[str] = []
-    if custom_prompt:
-        parts.append(custom_prompt)
     if context:
         parts.append("Context:\n" + "\n---\n".join(context))
     if web_snippets:
@@ -292,27 +713,40 @@ def build_prompt(question: str, context: List[str], web_snippets: List[str], cus
     return "\n\n".join(parts)
 
 
-async def call_llm(provider: str, prompt: str, settings: Settings, model: Optional[str], history: Optional[List[Dict[str, str]]]) -> str:
+# Base system message. Per-workflow instructions are appended to it rather than to the
+# user turn, so the leading messages stay identical across queries and providers'
+# prompt caches can reuse that prefix.
+_SYSTEM_PROMPT = "You are an assistant that answers using provided context first. Be concise."
+
+
+async def call_llm(
+    provider: str,
+    prompt: str,
+    settings: Settings,
+    model: Optional[str],
+    history: Optional[List[Dict[str, str]]],
+    system_prompt: Optional[str] = None,
+) -> str:
     """Send the prompt to the requested provider with light history support."""
 
     if provider == "gemini":
         if not settings.gemini_api_key:
             raise HTTPException(status_code=400, detail="Gemini provider selected but GEMINI_API_KEY is missing")
-        genai.configure(api_key=settings.gemini_api_key)
-        model_name = model or "gemini-2.5-flash"
-        gemini_model = genai.GenerativeModel(model_name)
-        response = await asyncio.to_thread(gemini_model.generate_content, prompt)
+        gemini_model = get_gemini_model(settings, model or "gemini-2.5-flash")
+        if system_prompt:
+            prompt = f"{system_prompt}\n\n{prompt}"
+        response = await gemini_model.generate_content_async(prompt)
         return response.text
 
     # Default to OpenAI.
     if not settings.openai_api_key:
         raise HTTPException(status_code=400, detail="OpenAI provider selected but OPENAI_API_KEY is missing")
 
-    client = AsyncOpenAI(api_key=settings.openai_api_key)
+    client = get_openai_client(settings)
     messages: List[Dict[str, str]] = [
         {
             "role": "system",
-            "content": "You are an assistant that answers using provided context first. Be concise.",
+            "content": f"{_SYSTEM_PROMPT}\n\n{system_prompt}" if system_prompt else _SYSTEM_PROMPT,
         }
     ]
     if history:
@@ -325,46 +759,80 @@ async def call_llm(provider: str, prompt: str, settings: Settings, model: Option
     return response.choices[0].message.content
 
 
-def validate_topology(payload: WorkflowDefinition) -> Dict[str, ComponentConfig]:
+def answer_cache_key(
+    provider: str, model: Optional[str], system_prompt: Optional[str], prompt: str, history: List[Dict[str, str]]
+) -> str:
+    """Digest of everything call_llm sends, used to key the answer cache."""
+
+    material = orjson.dumps([provider, model, system_prompt, prompt, history])
+    return hashlib.blake2b(material, digest_size=16).hexdigest()
+
+
+def get_cached_answer(key: str) -> Optional[str]:
+    """Return a fresh cached answer and mark it most recently used."""
+
+    cached = _answer_cache.pop(key, None)
+    if not cached or cached[0] <= time.time():
+        return None
+    _answer_cache[key] = cached
+    return cached[1]
+
+
+def cache_answer(key: str, answer: str) -> None:
+    """Store an LLM answer, evicting the least recently used entry when full."""
+
+    _answer_cache.pop(key, None)
+    if len(_answer_cache) >= _ANSWER_CACHE_MAX_SIZE:
+        _answer_cache.pop(next(iter(_answer_cache)))
+    _answer_cache[key] = (time.time() + _ANSWER_CACHE_TTL, answer)
+
+
+# Node types every runnable workflow must contain.
+_REQUIRED_NODE_TYPES = ("user_query", "llm_engine", "output")
+
+
+def validate_topology(nodes: List[ComponentConfig], edges: List[Edge]) -> Dict[str, ComponentConfig]:
     """Enforce required nodes and a reachable path User -> (KB) -> LLM -> Output."""
 
-    if not payload.nodes:
+    if not nodes:
         raise HTTPException(status_code=400, detail="Workflow must have at least one node")
-    if not payload.edges:
+    if not edges:
         raise HTTPException(status_code=400, detail="Workflow must have at least one edge")
 
-    node_ids = {n.id for n in payload.nodes}
-    for edge in payload.edges:
-        if edge.source not in node_ids or edge.target not in node_ids:
+    # Index nodes so adjacency is a list of int lists and visited state fits in one int bitset.
+    index = {n.id: i for i, n in enumerate(nodes)}
+    adjacency: List[List[int]] = [[] for _ in nodes]
+    for edge in edges:
+        source = index.get(edge.source)
+        target = index.get(edge.target)
+        if source is None or target is None:
             raise HTTPException(status_code=400, detail="Edges reference unknown nodes")
+        adjacency[source].append(target)
 
     by_type: Dict[str, ComponentConfig] = {}
-    for node in payload.nodes:
+    for node in nodes:
         if node.type in by_type:
             raise HTTPException(status_code=400, detail=f"Only one {node.type} node is allowed for now")
         by_type[node.type] = node
 
-    for required in ("user_query", "llm_engine", "output"):
+    for required in _REQUIRED_NODE_TYPES:
         if required not in by_type:
             raise HTTPException(status_code=400, detail=f"Missing required node: {required}")
 
     # Simple reachability: user_query must reach llm_engine and output.
-    adjacency: Dict[str, List[str]] = defaultdict(list)
-    for edge in payload.edges:
-        adjacency[edge.source].append(edge.target)
-
-    start = by_type["user_query"].id
-    needed = {by_type["llm_engine"].id, by_type["output"].id}
-    visited = set()
-    queue = deque([start])
-    while queue:
-        current = queue.popleft()
-        if current in visited:
-            continue
-        visited.add(current)
-        queue.extend(adjacency.get(current, []))
-
-    if not needed.issubset(visited):
+    start = index[by_type["user_query"].id]
+    needed = (1 << index[by_type["llm_engine"].id]) | (1 << index[by_type["output"].id])
+    visited = 1 << start
+    stack = [start]
+    # Stop as soon as both targets have been reached.
+    while stack and visited & needed != needed:
+        for target in adjacency[stack.pop()]:
+            bit = 1 << target
+            if not visited & bit:
+                visited |= bit
+                stack.append(target)
+
+    if visited & needed != needed:
         raise HTTPException(status_code=400, detail="Flow must connect User Query to LLM and Output")
 
     return by_type
@@ -418,13 +886,13 @@ async def register_user(request: Request, user_request: UserRegisterRequest) ->
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash password and create user
-    hashed_password = get_password_hash(user_request.password)
+    hashed_password = await get_password_hash(user_request.password)
     user = await create_user(user_request.username, user_request.email, hashed_password)
     
     # Create access token
     settings = get_settings()
     access_token = create_access_token(
-        data={"sub": user["id"], "username": user["username"]},
+        data={"sub": str(user["id"]), "username": user["username"]},
         settings=settings
     )
     
@@ -448,7 +916,7 @@ async def login_user(request: Request, login_request: UserLoginRequest) -> Token
     # Create access token
     settings = get_settings()
     access_token = create_access_token(
-        data={"sub": user["id"], "username": user["username"]},
+        data={"sub": str(user["id"]), "username": user["username"]},
         settings=settings
     )
     
@@ -474,7 +942,7 @@ async def get_current_user_info(
 @limiter.limit("60/minute")
 async def validate_workflow(request: Request, payload: WorkflowDefinition) -> Dict[str, str]:
     """Topology validation with basic single-instance constraints."""
-    validate_topology(payload)
+    validate_topology(payload.nodes, payload.edges)
     return {"status": "valid"}
 
 
@@ -482,6 +950,7 @@ async def validate_workflow(request: Request, payload: WorkflowDefinition) -> Di
 @limiter.limit("20/minute")
 async def upload_knowledge(
     request: Request,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     collection: str = "default",
     chunk_size: int = 800,
@@ -494,57 +963,54 @@ async def upload_knowledge(
     settings = get_settings()
     user_id = current_user["id"] if current_user else None
     
-    # Check throttle for heavy operation
-    client_ip = request.client.host
-    if not await check_throttle(client_ip, endpoint="upload"):
-        raise HTTPException(
-            status_code=429,
-            detail="Too many upload requests. Please wait before uploading again."
-        )
-    
-    data = await file.read()
-    text = extract_text_from_pdf_bytes(data)
+    # Spool to a temp file instead of holding the whole PDF in memory. The handle is
+    # closed before PyMuPDF reopens the file by name (Windows can't open it twice).
+    tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with tmp:
+            file_size = await spool_upload(file, tmp)
+        # PyMuPDF parsing is CPU-bound; keep it off the event loop.
+        text = await asyncio.to_thread(extract_text_from_pdf_path, tmp.name)
+    finally:
+        os.unlink(tmp.name)
     if not text:
         raise HTTPException(status_code=400, detail="Could not extract text from the uploaded file")
 
     chunks = chunk_text(text, chunk_size=chunk_size, overlap=chunk_overlap)
-    embeddings = await embed_texts(chunks, settings, embedding_model)
+    # Repeated headers/footers produce identical chunks; embed and store each once.
+    unique_chunks = list(dict.fromkeys(chunks))
     collection_handle = get_chroma_collection(settings, collection)
-    ids = await upsert_documents(collection_handle, chunks, embeddings)
+    ids = await embed_and_upsert(collection_handle, unique_chunks, settings, embedding_model)
     
-    # Store document metadata in PostgreSQL for tracking.
-    doc_metadata = await save_document_metadata(
+    # Store document metadata in PostgreSQL for tracking, after the response is sent.
+    # The uuid is assigned here so the response doesn't wait on the insert.
+    document_uuid = uuid4()
+    background_tasks.add_task(
+        save_document_metadata,
         filename=file.filename,
-        file_size=len(data),
+        file_size=file_size,
         collection_name=collection,
         chunk_count=len(chunks),
         embedding_model=embedding_model or "default",
-        user_id=user_id
+        user_id=user_id,
+        uuid=document_uuid,
     )
     
     return {
         "collection": collection,
         "chunks": len(chunks),
+        "unique_chunks": len(unique_chunks),
         "ids": ids[:5],
-        "document_uuid": doc_metadata.get("uuid")
+        "document_uuid": document_uuid
     }
 
 
 @app.get("/knowledge/collections",response_model=None)
-@limiter.limit("30/minute")  # Lower rate limit for this endpoint
+@limiter.limit(lambda: f"{get_settings().collection_endpoint_rate_limit}/minute")  # Lower rate limit for this endpoint
 async def list_collections(request: Request) -> Dict[str, Any]:
     """Return available Chroma collections to help the UI pick targets."""
 
     settings = get_settings()
-    
-    # Additional throttling for this specific endpoint to prevent abuse
-    client_ip = request.client.host
-    if not await check_throttle(client_ip, endpoint="collections"):
-        raise HTTPException(
-            status_code=429,
-            detail=f"Too many requests to collections endpoint. Max {settings.collection_endpoint_rate_limit} requests per minute."
-        )
-    
     client = get_chroma_client(settings)
     collections = await asyncio.to_thread(client.list_collections)
     return {"collections": [{"name": c.name, "metadata": c.metadata} for c in collections]}
@@ -555,6 +1021,7 @@ async def list_collections(request: Request) -> Dict[str, Any]:
 async def run_chat(
     request: Request,
     chat_request: ChatRequest,
+    background_tasks: BackgroundTasks,
     current_user: Optional[dict] = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """Execute the built workflow with retrieval + LLM generation."""
@@ -569,41 +1036,53 @@ async def run_chat(
     chat_history = chat_request.history[-5:] if chat_request.history else []  # Keep only last 5 messages
     
     try:
-        nodes_by_type = validate_topology(chat_request.workflow)
+        nodes_by_type = validate_topology(chat_request.workflow.nodes, chat_request.workflow.edges)
 
         llm_node = nodes_by_type["llm_engine"]
         kb_node = nodes_by_type.get("knowledge_base")
 
-        context_chunks: List[str] = []
-        if kb_node:
+        async def retrieve_context() -> List[str]:
+            if not kb_node:
+                return []
             kb_params = kb_node.params or {}
             collection_name = kb_params.get("collection_name", "default")
             top_k = min(int(kb_params.get("top_k", 4)), 3)  # Limit to 3 chunks max to save memory
             embedding_model = kb_params.get("embedding_model")
             collection_handle = get_chroma_collection(settings, collection_name)
-            query_embedding = (await embed_texts([chat_request.message], settings, embedding_model))[0]
-            context_chunks = await query_collection(collection_handle, query_embedding, top_k=top_k)
+            query_embedding = await embed_query(chat_request.message, settings, embedding_model)
+            return await query_collection(collection_handle, query_embedding, top_k=top_k)
+
+        async def search_web() -> List[str]:
+            if not llm_node.params.get("web_search"):
+                return []
+            web_results = await run_web_search(chat_request.message, settings)
+            return web_results[:2]  # Limit web snippets to prevent memory bloat
 
-        web_snippets: List[str] = []
-        if llm_node.params.get("web_search"):
-            web_snippets = run_web_search(chat_request.message, settings)
-            web_snippets = web_snippets[:2]  # Limit web snippets to prevent memory bloat
+        # KB retrieval and web search are independent; overlap their round trips.
+        context_chunks, web_snippets = await asyncio.gather(retrieve_context(), search_web())
 
         prompt = build_prompt(
             question=chat_request.message,
             context=context_chunks,
             web_snippets=web_snippets,
-            custom_prompt=llm_node.params.get("prompt"),
         )
+        system_prompt = llm_node.params.get("prompt")
 
         provider = llm_node.params.get("provider") or ("openai" if settings.openai_api_key else "gemini")
         llm_model = llm_node.params.get("model")
-        answer = await call_llm(provider, prompt, settings, llm_model, chat_history)
+        cache_key = answer_cache_key(provider, llm_model, system_prompt, prompt, chat_history)
+        answer = get_cached_answer(cache_key)
+        cached = answer is not None
+        if not cached:
+            # Repeat questions with identical context reuse the answer; everything
+            # else (including the logging below) runs the same either way.
+            answer = await call_llm(provider, prompt, settings, llm_model, chat_history, system_prompt)
+            cache_answer(cache_key, answer)
         
         execution_time_ms = int((time.time() - start_time) * 1000)
 
-        # Save chat log to PostgreSQL for audit trail and history.
-        await save_chat_log(
+        # Queue chat log for PostgreSQL (audit trail and history); written in background batches.
+        await enqueue_chat_log(
             workflow_uuid=None,
             message=chat_request.message,
             response=answer,
@@ -613,8 +1092,9 @@ async def run_chat(
             user_id=user_id
         )
         
-        # Save execution log
-        await save_execution_log(
+        # Save execution log once the answer has been sent.
+        background_tasks.add_task(
+            save_execution_log,
             user_id=user_id,
             workflow_uuid=None,
             workflow_name=workflow_name,
@@ -636,6 +1116,7 @@ async def run_chat(
             "web_used": bool(web_snippets),
             "web_samples": web_snippets[:1],  # Return only 1 sample instead of 2
             "execution_time_ms": execution_time_ms,
+            "cached": cached,
         }
     
     except Exception as e:
@@ -678,15 +1159,13 @@ async def save_workflow_endpoint(
 ) -> Dict[str, Any]:
     """Save a new workflow to the database. Returns uuid and metadata."""
     # Validate before saving.
-    validate_topology(
-        WorkflowDefinition(nodes=workflow_request.nodes, edges=workflow_request.edges)
-    )
+    validate_topology(workflow_request.nodes, workflow_request.edges)
     user_id = current_user["id"] if current_user else None
     result = await save_workflow(
         workflow_request.name,
         workflow_request.description or "",
-        [node.model_dump() for node in workflow_request.nodes],
-        [edge.model_dump() for edge in workflow_request.edges],
+        _NODE_LIST.dump_python(workflow_request.nodes),
+        _EDGE_LIST.dump_python(workflow_request.edges),
         user_id
     )
     return result
@@ -694,7 +1173,7 @@ async def save_workflow_endpoint(
 
 @app.get("/workflow/{uuid}", response_model=None)
 @limiter.limit("60/minute")
-async def get_workflow_endpoint(request: Request, uuid: str) -> Dict[str, Any]:
+async def get_workflow_endpoint(request: Request, uuid: UUID) -> Dict[str, Any]:
     """Retrieve a saved workflow by uuid."""
     result = await get_workflow(uuid)
     if not result:
@@ -707,27 +1186,25 @@ async def get_workflow_endpoint(request: Request, uuid: str) -> Dict[str, Any]:
 async def list_workflows_endpoint(
     request: Request,
     current_user: Optional[dict] = Depends(get_current_user)
-) -> Dict[str, Any]:
+) -> RecordJSONResponse:
     """List all saved workflows (name, uuid, timestamps). Filter by user if authenticated."""
     user_id = current_user["id"] if current_user else None
     workflows = await list_workflows(user_id)
-    return {"workflows": workflows}
+    return RecordJSONResponse({"workflows": workflows})
 
 
 @app.post("/workflow/{uuid}/update", response_model=None)
 @limiter.limit("30/minute")
-async def update_workflow_endpoint(request: Request, uuid: str, workflow_request: WorkflowSaveRequest) -> Dict[str, Any]:
+async def update_workflow_endpoint(request: Request, uuid: UUID, workflow_request: WorkflowSaveRequest) -> Dict[str, Any]:
     """Update an existing workflow by uuid."""
     # Validate before updating.
-    validate_topology(
-        WorkflowDefinition(nodes=workflow_request.nodes, edges=workflow_request.edges)
-    )
+    validate_topology(workflow_request.nodes, workflow_request.edges)
     result = await update_workflow(
         uuid,
         workflow_request.name,
         workflow_request.description or "",
-        [node.model_dump() for node in workflow_request.nodes],
-        [edge.model_dump() for edge in workflow_request.edges]
+        _NODE_LIST.dump_python(workflow_request.nodes),
+        _EDGE_LIST.dump_python(workflow_request.edges)
     )
     if not result:
         raise HTTPException(status_code=404, detail="Workflow not found")
@@ -736,7 +1213,7 @@ async def update_workflow_endpoint(request: Request, uuid: str, workflow_request
 
 @app.delete("/workflow/{uuid}", response_model=None)
 @limiter.limit("30/minute")
-async def delete_workflow_endpoint(request: Request, uuid: str) -> Dict[str, str]:
+async def delete_workflow_endpoint(request: Request, uuid: UUID) -> Dict[str, str]:
     """Delete a workflow by uuid."""
     success = await delete_workflow(uuid)
     if not success:
@@ -750,46 +1227,46 @@ async def list_documents_endpoint(
     request: Request,
     collection: Optional[str] = None,
     current_user: Optional[dict] = Depends(get_current_user)
-) -> Dict[str, Any]:
+) -> RecordJSONResponse:
     """
     List uploaded documents with metadata.
     Optionally filter by collection name and/or user.
     """
     user_id = current_user["id"] if current_user else None
     documents = await list_documents(collection, user_id)
-    return {"documents": documents}
+    return RecordJSONResponse({"documents": documents})
 
 
 @app.get("/chat/history", response_model=None)
 @limiter.limit("60/minute")
 async def get_chat_history(
     request: Request,
-    workflow_uuid: Optional[str] = None,
+    workflow_uuid: Optional[UUID] = None,
     limit: int = 50,
     current_user: Optional[dict] = Depends(get_current_user)
-) -> Dict[str, Any]:
+) -> RecordJSONResponse:
     """
     Retrieve chat conversation history.
     Optionally filter by workflow uuid, user, and limit results.
     """
     user_id = current_user["id"] if current_user else None
     logs = await list_chat_logs(workflow_uuid, user_id, limit)
-    return {"logs": logs}
+    return RecordJSONResponse({"logs": logs})
 
 
 @app.get("/execution/logs", response_model=None)
 @limiter.limit("60/minute")
 async def get_execution_logs(
     request: Request,
-    workflow_uuid: Optional[str] = None,
+    workflow_uuid: Optional[UUID] = None,
     status: Optional[str] = None,
     limit: int = 100,
     current_user: Optional[dict] = Depends(get_current_user)
-) -> Dict[str, Any]:
+) -> RecordJSONResponse:
     """
     Retrieve workflow execution logs.
     Optionally filter by workflow uuid, status, and user.
     """
     user_id = current_user["id"] if current_user else None
     logs = await list_execution_logs(user_id, workflow_uuid, status, limit)
-    return {"logs": logs}
+    return RecordJSONResponse({"logs": logs})
@@ -1,3 +1,6 @@
+import asyncio
+import logging
+
 from mangum import Mangum
 import sys
 import os
@@ -5,7 +8,26 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from app.database import init_db
 from app.main import app
 
 # Export handler for Netlify
-handler = Mangum(app, lifespan="off")
\ No newline at end of file
+handler = Mangum(app, lifespan="off")
+
+# Use uvloop (shipped with uvicorn[standard]) for the loop Mangum drives, where available.
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - e.g. Windows
+    pass
+else:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+# Lifespan is off, so warm the DB pool here while the container boots. Mangum
+# drives requests on this same event loop, so the pool stays usable.
+try:
+    asyncio.get_event_loop().run_until_complete(init_db())
+except Exception:
+    # Missing DATABASE_URL or unreachable DB: get_pool() retries lazily per request.
+    logging.getLogger(__name__).warning(
+        "Database prewarm failed; falling back to lazy pool creation", exc_info=True
+    )
@@ -0,0 +1,46 @@
+"""
+RecordJSONResponse must serialize asyncpg Records as returned by the list queries,
+including native UUID columns (asyncpg decodes those to its own uuid.UUID subclass).
+"""
+
+import asyncio
+import os
+import uuid
+
+import pytest
+
+asyncpg = pytest.importorskip("asyncpg")
+orjson = pytest.importorskip("orjson")
+
+from app.main import RecordJSONResponse  # noqa: E402
+
+
+def test_asyncpg_uuid_subclass_serializes_as_string():
+    value = asyncpg.pgproto.pgproto.UUID("12345678-1234-5678-1234-567812345678")
+    body = RecordJSONResponse({"uuid": value}).body
+    assert orjson.loads(body) == {"uuid": "12345678-1234-5678-1234-567812345678"}
+
+
+@pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="needs a PostgreSQL DATABASE_URL")
+def test_record_with_uuid_column_serializes():
+    expected = uuid.uuid4()
+
+    async def fetch_rows():
+        conn = await asyncpg.connect(os.environ["DATABASE_URL"])
+        try:
+            return await conn.fetch(
+                "SELECT 1 AS id, $1::uuid AS uuid, NULL::uuid AS workflow_uuid, now() AS created_at",
+                expected,
+            )
+        finally:
+            await conn.close()
+
+    rows = asyncio.run(fetch_rows())
+    assert isinstance(rows[0]["uuid"], uuid.UUID)
+
+    payload = orjson.loads(RecordJSONResponse({"logs": rows}).body)
+    row = payload["logs"][0]
+    assert row["id"] == 1
+    assert row["uuid"] == str(expected)
+    assert row["workflow_uuid"] is None
+    assert "created_at" in row